@@ -1,39 +1,48 @@
 import boto3
 import csv
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain, combinations
 from botocore.exceptions import ClientError
-
-# Only A-series AMD instance types
-AMD_A_SERIES_INSTANCES = ["m5a", "r5a", "c6a", "m6a", "t3a", "r6a", "hpc6a", "g4ad", "m7a", "c7a", "r7a"]
+from spot_common import BOTO_CFG, describe_filtered_instance_types, parse_args
+
+MAX_WORKERS = 16
+
+# One Session shares loaded service models and credentials across threads. Session.client() is
+# not thread-safe, so clients are created under a lock and cached per thread and region.
+_SESSION = boto3.session.Session()
+_SESSION_LOCK = threading.Lock()
+_thread_local = threading.local()
+
+def _ec2(region):
+    """Return an EC2 client for `region` owned by the calling thread."""
+    clients = getattr(_thread_local, 'clients', None)
+    if clients is None:
+        clients = _thread_local.clients = {}
+    if region not in clients:
+        with _SESSION_LOCK:
+            clients[region] = _SESSION.client('ec2', region_name=region, config=BOTO_CFG)
+    return clients[region]
 
 def get_all_regions():
     """Fetch available AWS regions where Spot instances are  supported."""
-    ec2 = boto3.client('ec2', region_name='us-east-1')
+    ec2 = _ec2('us-east-1')
     response = ec2.describe_regions(AllRegions=True)
     return [r['RegionName'] for r in response['Regions'] if r.get('OptInStatus', 'opted-in') != 'not-opted-in']
 
 def get_filtered_instance_types(region, exact_vcpus, exact_memory_gib):
     """Fetch A-series AMD instance types matching exact vCPUs and RAM."""
-    ec2 = boto3.client('ec2', region_name=region)
-    filters = [
-        {'Name': 'vcpu-info.default-vcpus', 'Values': [str(exact_vcpus)]},
-        {'Name': 'memory-info.size-in-mib', 'Values': [str(int(exact_memory_gib * 1024))]},
-        {'Name': 'supported-usage-class', 'Values': ['spot']}
-    ]
-    instance_types = []
     try:
-        paginator = ec2.get_paginator('describe_instance_types')
-        for page in paginator.paginate(Filters=filters):
-            for it in page['InstanceTypes']:
-                if any(it['InstanceType'].startswith(prefix) for prefix in AMD_A_SERIES_INSTANCES):
-                    instance_types.append(it['InstanceType'])
+        return describe_filtered_instance_types(_ec2(region), exact_vcpus, exact_memory_gib)
     except ClientError as e:
         print(f"Error fetching instance types in region {region}: {e}")
-    return instance_types
+        return []
 
 def get_spot_placement_scores(region, instance_type_list):
     """Retrieve Spot placement scores for a set of instance types."""
-    ec2 = boto3.client('ec2', region_name=region)
+    ec2 = _ec2(region)
     try:
         response = ec2.get_spot_placement_scores(
             InstanceTypes=instance_type_list,
@@ -54,14 +63,31 @@ def get_spot_placement_scores(region, instance_type_list):
     return scores
 
 def powerset(iterable, min_size=3):
-    """Generate all subsets of an iterable with at least `min_size` elements."""
+    """Lazily generate all subsets of an iterable with at least `min_size` elements."""
     s = list(iterable)
-    return [set(comb) for comb in chain.from_iterable(combinations(s, r) for r in range(min_size, len(s)+1))]
+    return chain.from_iterable(combinations(s, r) for r in range(min_size, len(s)+1))
+
+def evaluate_subset(region, subset):
+    """Score one instance-type subset, returning the subset as a list and its total score."""
+    subset_list = list(subset)
+    scores = get_spot_placement_scores(region, subset_list)
+    return subset_list, sum(scores.values())  # Sum of scores for this subset
+
+def score_subsets(executor, region, subsets):
+    """Yield (subset_list, total_score) in enumeration order, keeping a bounded number of subsets in flight."""
+    pending = deque()
+    for subset in subsets:
+        pending.append(executor.submit(evaluate_subset, region, subset))
+        if len(pending) >= 2 * MAX_WORKERS:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
 def main():
-    exact_vcpus = int(input("Enter exact number of vCPUs: "))
-    exact_memory = float(input("Enter exact memory (GiB): "))
-    output_file = "highest_spot_placement_score.csv"
+    args = parse_args("Find the AMD A-series spot instance set with the highest placement score.", "highest_spot_placement_score.csv")
+    exact_vcpus = args.vcpus
+    exact_memory = args.memory_gib
+    output_file = args.output
 
     region = "us-east-1"
     print(f"Processing region: {region}")
@@ -75,33 +101,26 @@ def main():
     print(f"Filtered instance types: {instance_types}")
 
     # Step 2: Generate power set of instance types (only sets with 3+ elements)
-    instance_combinations = powerset(instance_types)
+    min_size = 3
+    instance_combinations = powerset(instance_types, min_size)
+    n = len(instance_types)
+    print(f"Evaluating {sum(math.comb(n, r) for r in range(min_size, n + 1))} combinations...")
 
-    # Step 3: Calculate Spot placement scores for each subset
+    # Step 3: Calculate Spot placement scores for each subset concurrently,
+    # streaming results to CSV in enumeration order so ties keep the first subset
     best_set = None
     highest_score = 0
-    results = []
-
-    for subset in instance_combinations:
-        subset_list = list(subset)
-        scores = get_spot_placement_scores(region, subset_list)
-        total_score = sum(scores.values())  # Sum of scores for this subset
-
-        results.append({
-            "instance_set": ', '.join(subset_list),
-            "score": total_score
-        })
-
-        if total_score > highest_score:
-            highest_score = total_score
-            best_set = subset_list
-
-    # Step 4: Save results to CSV
-    with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = ["instance_set", "score"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
+
+    with open(output_file, 'w', newline='') as csvfile, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        writer = csv.writer(csvfile)
+        writer.writerow(("instance_set", "score"))
+
+        for subset_list, total_score in score_subsets(executor, region, instance_combinations):
+            writer.writerow((', '.join(subset_list), total_score))
+
+            if total_score > highest_score:
+                highest_score = total_score
+                best_set = subset_list
 
     print(f"Results saved to {output_file}")
     print(f"Best instance set: {best_set} with a Spot placement score of {highest_score}")
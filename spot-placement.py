@@ -1,4 +1,5 @@
 import boto3
+from spot_common import BOTO_CFG
 
 def get_spot_placement_score(instance_types, target_capacity=1, region_names=[], single_az=False):
     """
@@ -14,7 +15,7 @@ def get_spot_placement_score(instance_types, target_capacity=1, region_names=[],
       list: A list of dictionaries with placement scores.
     """
     # Use a default region to initiate the client (this doesn't limit the API to that region)
-    client = boto3.client('ec2', region_name='us-east-1')
+    client = boto3.client('ec2', region_name='us-east-1', config=BOTO_CFG)
     
     response = client.get_spot_placement_scores(
         InstanceTypes=instance_types,
@@ -0,0 +1,54 @@
+import argparse
+import sys
+from botocore.config import Config
+
+# Only AMD A-series types; trailing dots keep a family from matching a longer family name
+AMD_A_SERIES_PREFIXES = ("m5a.", "m5ad.", "r5a.", "r5ad.", "c6a.", "m6a.", "t3a.", "r6a.", "hpc6a.", "g4ad.", "m7a.", "c7a.", "r7a.")
+
+# Adaptive retries absorb API throttling; the pool is large enough for script.py's worker threads
+BOTO_CFG = Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=50, user_agent_extra='spot-finder/1.0')
+
+def describe_filtered_instance_types(ec2, exact_vcpus, exact_memory_gib):
+    """Return AMD A-series spot instance types with exactly `exact_vcpus` vCPUs and `exact_memory_gib` GiB."""
+    filters = [
+        {'Name': 'vcpu-info.default-vcpus', 'Values': [str(exact_vcpus)]},
+        {'Name': 'memory-info.size-in-mib', 'Values': [str(int(exact_memory_gib * 1024))]},
+        {'Name': 'supported-usage-class', 'Values': ['spot']},
+        # Values are OR'ed, so the AMD family filter runs server-side
+        {'Name': 'instance-type', 'Values': [f'{prefix}*' for prefix in AMD_A_SERIES_PREFIXES]}
+    ]
+    instance_types = []
+    # The filtered result nearly always fits in one page, so only follow NextToken when present
+    page = ec2.describe_instance_types(Filters=filters, MaxResults=100)
+    while True:
+        for it in page['InstanceTypes']:
+            if it['InstanceType'].startswith(AMD_A_SERIES_PREFIXES):  # safety net for the server-side filter
+                instance_types.append(it['InstanceType'])
+        if 'NextToken' not in page:
+            break
+        page = ec2.describe_instance_types(Filters=filters, MaxResults=100, NextToken=page['NextToken'])
+    return instance_types
+
+def parse_args(description, default_output):
+    """Read vCPUs, memory and output path from the command line, prompting only when interactive."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--vcpus", type=int, help="exact number of vCPUs")
+    parser.add_argument("--memory-gib", type=float, help="exact memory (GiB)")
+    parser.add_argument("--output", default=default_output, help="CSV file to write")
+    args = parser.parse_args()
+
+    try:
+        if args.vcpus is None and sys.stdin.isatty():
+            args.vcpus = int(input("Enter exact number of vCPUs: "))
+        if args.memory_gib is None and sys.stdin.isatty():
+            args.memory_gib = float(input("Enter exact memory (GiB): "))
+    except (ValueError, EOFError) as e:
+        parser.error(str(e) or "no input given")
+
+    if args.vcpus is None or args.memory_gib is None:
+        parser.error("--vcpus and --memory-gib are required when not running interactively")
+    if args.vcpus < 1:
+        parser.error("--vcpus must be at least 1")
+    if not 0 < args.memory_gib <= 24576:
+        parser.error("--memory-gib must be greater than 0 and at most 24576")
+    return args
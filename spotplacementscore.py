@@ -1,74 +1,85 @@
 import boto3
 import csv
-from itertools import chain, combinations
+import functools
 from botocore.exceptions import ClientError
+from itertools import accumulate
+from operator import itemgetter
 import time
+from spot_common import BOTO_CFG, describe_filtered_instance_types, parse_args
 
-# Only AMD A-series types
-AMD_A_SERIES_INSTANCES = ["m5a", "r5a", "c6a", "m6a", "t3a", "r6a", "hpc6a", "g4ad", "m7a", "c7a", "r7a"]
+_SESSION = boto3.session.Session()
 
-def get_filtered_instance_types(region, exact_vcpus, exact_memory_gib):
-    ec2 = boto3.client('ec2', region_name=region)
-    filters = [
-        {'Name': 'vcpu-info.default-vcpus', 'Values': [str(exact_vcpus)]},
-        {'Name': 'memory-info.size-in-mib', 'Values': [str(int(exact_memory_gib * 1024))]},
-        {'Name': 'supported-usage-class', 'Values': ['spot']}
+# Spot placement scores range from 1 to 10
+MAX_PLACEMENT_SCORE = 10
+
+# Latest Linux/UNIX spot price per instance type, filled once by load_spot_prices()
+PRICE_CACHE = {}
+
+@functools.lru_cache(maxsize=None)
+def _ec2(region):
+    return _SESSION.client('ec2', region_name=region, config=BOTO_CFG)
+
+def greedy_subsets(instance_types, prices, min_size=3):
+    """Rank instance types cheapest first and return (prefix, average_price) for the top-k prefixes of size min_size..N.
+
+    average_price is None when any member of the prefix has no price history.
+    """
+    # Types without price history sort last
+    ranked = sorted(instance_types, key=lambda itype: (itype not in prices, prices.get(itype, 0.0)))
+    # Running totals give every prefix's average price without re-summing it
+    price_sums = list(accumulate(prices.get(itype, 0.0) for itype in ranked))
+    priced_counts = list(accumulate(itype in prices for itype in ranked))
+    return [
+        (ranked[:k], price_sums[k - 1] / k if priced_counts[k - 1] == k else None)
+        for k in range(min_size, len(ranked) + 1)
     ]
-    instance_types = []
-    paginator = ec2.get_paginator('describe_instance_types')
-    for page in paginator.paginate(Filters=filters):
-        for it in page['InstanceTypes']:
-            if any(it['InstanceType'].startswith(prefix) for prefix in AMD_A_SERIES_INSTANCES):
-                instance_types.append(it['InstanceType'])
-    return instance_types 
-
-def powerset(iterable, min_size=3):
-    s = list(iterable)
-    return [list(comb) for comb in chain.from_iterable(combinations(s, r) for r in range(min_size, len(s)+1))]
-def get_average_spot_placement_score(region, instance_types):
-    ec2 = boto3.client('ec2', region_name=region)
+def get_best_az_placement_score(ec2, region, instance_types):
+    """Return (AvailabilityZoneId, score) for the best-scoring AZ of a set, or (None, 0) if unscored."""
     try:
         response = ec2.get_spot_placement_scores(
             InstanceTypes=instance_types,
             TargetCapacity=1,
-            SingleAvailabilityZone=False,
+            SingleAvailabilityZone=True,
             RegionNames=[region]
         )
-        scores = []
+        best_az, best_score = None, 0
         for rec in response.get('SpotPlacementScores', []):
-            scores.append(rec['Score'])
-        return sum(scores) / len(scores) if scores else 0.0
+            if rec['Score'] > best_score:
+                best_az, best_score = rec.get('AvailabilityZoneId'), rec['Score']
+        return best_az, best_score
     except ClientError as e:
         print(f"[Score API Error] {e}")
-        return 0.0
-
-
-def get_average_spot_price(region, instance_types):
-    ec2 = boto3.client('ec2', region_name=region)
-    prices = []
-    for itype in instance_types:
-        try:
-            response = ec2.describe_spot_price_history(
-                InstanceTypes=[itype],
-                ProductDescriptions=['Linux/UNIX'],
-                StartTime=time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
-                MaxResults=1
-            )
-            for history in response['SpotPriceHistory']:
-                prices.append(float(history['SpotPrice']))
-        except ClientError as e:
-            print(f"[Price API Error for {itype}] {e}")
-            continue
-    return sum(prices) / len(prices) if prices else 0.0
+        return None, 0
+
+
+def load_spot_prices(ec2, instance_types):
+    latest = {}
+    try:
+        paginator = ec2.get_paginator('describe_spot_price_history')
+        for page in paginator.paginate(
+            InstanceTypes=instance_types,
+            ProductDescriptions=['Linux/UNIX'],
+            StartTime=time.time() - 3600
+        ):
+            for history in page['SpotPriceHistory']:
+                itype = history['InstanceType']
+                latest[itype] = max(latest.get(itype, history), history, key=itemgetter('Timestamp'))
+    except ClientError as e:
+        print(f"[Price API Error] {e}")
+    for itype, history in latest.items():
+        PRICE_CACHE[itype] = float(history['SpotPrice'])
+
 def main():
     region = "us-east-1"
-    exact_vcpus = int(input("Enter exact number of vCPUs: "))
-    exact_memory = float(input("Enter exact memory (GiB): "))
-    output_file = "spot_instance_scores.csv"
+    args = parse_args("Rank AMD A-series spot instance sets by placement score and price.", "spot_instance_scores.csv")
+    exact_vcpus = args.vcpus
+    exact_memory = args.memory_gib
+    output_file = args.output
+    ec2 = _ec2(region)
 
     print(f"\n📍 Region: {region}")
     print("🔍 Fetching instance types...")
-    instance_types = get_filtered_instance_types(region, exact_vcpus, exact_memory)
+    instance_types = describe_filtered_instance_types(ec2, exact_vcpus, exact_memory)
 
     if not instance_types:
         print("❌ No matching AMD A-series spot instances found.")
@@ -76,39 +87,44 @@ def main():
 
     print(f"✅ Found {len(instance_types)} eligible instance types: {instance_types}")
 
-    subsets = powerset(instance_types, min_size=3)
+    # Price all types in one batched lookup; subset prices are averaged from the cache
+    print("💲 Fetching spot prices...")
+    load_spot_prices(ec2, instance_types)
+
+    subsets = greedy_subsets(instance_types, PRICE_CACHE, min_size=3)
     print(f"🧮 Evaluating {len(subsets)} combinations...")
 
     results = []
 
-    for idx, subset in enumerate(subsets, start=1):
+    for idx, (subset, avg_price) in enumerate(subsets, start=1):
         print(f" Subset {idx}/{len(subsets)}: {subset}")
 
-        avg_score = get_average_spot_placement_score(region, subset)
-        avg_price = get_average_spot_price(region, subset)
+        best_az, az_score = get_best_az_placement_score(ec2, region, subset)
 
-        if avg_score == 0.0:
+        if az_score == 0:
             print("⚠️ Skipping due to 0 placement score.")
             continue
 
-        results.append({
-            "instance_set": ', '.join(subset),
-            "average_score": round(avg_score, 2),
-            "average_price": round(avg_price, 4),
-            "count": len(subset)
-        })
-    # Sort by highest score first, then by lowest price
-    results.sort(key=lambda x: (-x["average_score"], x["average_price"]))
+        # (instance_set, availability_zone_id, max_az_score, region_average_price, count);
+        # the price is the latest per-type price from any AZ in the region, not the price in availability_zone_id
+        results.append((', '.join(subset), best_az, az_score, None if avg_price is None else round(avg_price, 4), len(subset)))
+
+        # Later prefixes only add pricier types, so none can beat a set that already has the top score
+        if az_score >= MAX_PLACEMENT_SCORE:
+            print(f"🏁 Reached the maximum score of {MAX_PLACEMENT_SCORE}; skipping larger sets.")
+            break
+    # Sort by highest AZ score first, then by lowest price, with partly priced sets last
+    results.sort(key=lambda x: (-x[2], x[3] is None, x[3] or 0.0))
 
     print("\n✅ Top combinations:")
-    for row in results[:5]:
-        print(f"💡 {row['instance_set']} | Score: {row['average_score']} | Price: ${row['average_price']}")
+    for instance_set, az_id, az_score, average_price, _ in results[:5]:
+        price = "N/A" if average_price is None else f"${average_price}"
+        print(f"💡 {instance_set} | AZ: {az_id} | Score: {az_score} | Region price: {price}")
 
     # Write results to CSV
     with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = ["instance_set", "average_score", "average_price", "count"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(csvfile)
+        writer.writerow(("instance_set", "availability_zone_id", "max_az_score", "region_average_price", "count"))
         writer.writerows(results)
 
     print(f"\n📁 Results saved to {output_file}")